@@ -0,0 +1,219 @@
+"""Kjører mange seedede spill uten vindu i parallell, for å justere vanskelighetsgraden.
+
+Hvert spill spilles av autopiloten i space_invaders til det er over (eller
+når --max-ticks), og spillene fordeles på en prosesspool. Resultatene slås
+sammen per nivå (overlevelsestid, drap per bølge, score) og skrives til én
+samlet JSON-rapport:
+
+    python batch_simulator.py --games 200 --workers 8 --json batch.json
+
+Spill nummer k får seeden --seed + k, så samme kommando gir samme rapport
+uansett antall prosesser.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+si = None  # space_invaders, importert én gang per prosess av import_game()
+
+
+def import_game():
+    global si
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    sys.path.insert(0, ROOT)
+    import space_invaders
+    si = space_invaders
+
+
+def init_worker():
+    import_game()
+    # Simuleringen leser og skriver ingen highscores, så fil og leaderboard-klient hoppes over
+    si.init_game(headless=True, highscores=False)
+
+
+def simulate_game(seed, max_ticks):
+    """Spiller ett spill med autopiloten og returnerer resultatet per nivå"""
+    si.reset_game(seed)
+    levels = []
+    level_start_tick = 0
+    level_start_score = 0
+    kills = 0
+    game_over = False
+    tick = 0
+
+    def finish_level(level, outcome):
+        levels.append({
+            "level": level,
+            "outcome": outcome,  # "cleared", "died" eller "timeout"
+            "ticks": tick - level_start_tick,
+            "kills": kills,
+            "score": si.score - level_start_score,
+        })
+
+    while tick < max_ticks and not game_over:
+        move_left, move_right, fire = si.autopilot_input(tick)
+        if fire:
+            si.fire_player_bullet()
+        level = si.current_level
+        aliens_before = si.aliens.count
+        game_over = si.update_game(move_left, move_right)
+        tick += 1
+
+        if si.current_level != level:
+            # Nivået ble ryddet i denne ticken: alle gjenværende fiender ble skutt
+            kills += aliens_before
+            finish_level(level, "cleared")
+            level_start_tick, level_start_score, kills = tick, si.score, 0
+        else:
+            kills += aliens_before - si.aliens.count
+
+    if game_over:
+        finish_level(si.current_level, "died")
+    else:
+        finish_level(si.current_level, "timeout")
+    return {"seed": seed, "score": si.score, "ticks": tick, "level": si.current_level,
+            "wave": si.current_wave, "levels": levels}
+
+
+def simulate_batch(seeds, max_ticks):
+    return [simulate_game(seed, max_ticks) for seed in seeds]
+
+
+def distribution(values):
+    """Minimum, snitt, p50, p90 og maksimum for en liste med tall"""
+    if not values:
+        return None
+    if len(values) == 1:
+        p50 = p90 = values[0]
+    else:
+        cuts = statistics.quantiles(values, n=10, method='inclusive')
+        p50, p90 = statistics.median(values), cuts[8]
+    return {"min": min(values), "mean": statistics.fmean(values), "p50": p50, "p90": p90, "max": max(values)}
+
+
+def aggregate(games):
+    """Slår sammen resultatene til statistikk per nivå og for hele spill"""
+    per_level = {}
+    for game in games:
+        for entry in game["levels"]:
+            per_level.setdefault(entry["level"], []).append(entry)
+
+    levels = []
+    for level in sorted(per_level):
+        entries = per_level[level]
+        cleared = [e for e in entries if e["outcome"] == "cleared"]
+        config = si.level_configs.get_level(level)
+        levels.append({
+            "level": level,
+            "cycle": (level - 1) // si.level_configs.max_level + 1,
+            "name": config.name,
+            "pattern": config.pattern,
+            "attempts": len(entries),
+            "cleared": len(cleared),
+            "deaths": sum(e["outcome"] == "died" for e in entries),
+            "clear_rate": len(cleared) / len(entries),
+            "survival_seconds": distribution([e["ticks"] / si.TICK_RATE for e in entries]),
+            "clear_seconds": distribution([e["ticks"] / si.TICK_RATE for e in cleared]),
+            "kills_per_wave": distribution([e["kills"] for e in entries]),
+            "score": distribution([e["score"] for e in entries]),
+        })
+
+    return {
+        "games": {
+            "count": len(games),
+            "score": distribution([game["score"] for game in games]),
+            "final_level": distribution([game["level"] for game in games]),
+            "survival_seconds": distribution([game["ticks"] / si.TICK_RATE for game in games]),
+            "timeouts": sum(game["levels"][-1]["outcome"] == "timeout" for game in games if game["levels"]),
+        },
+        "levels": levels,
+    }
+
+
+def run_batch(games, workers, seed, max_ticks, chunk_size):
+    """Fordeler spillene på `workers` prosesser og returnerer den samlede rapporten"""
+    seeds = list(range(seed, seed + games))
+    chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        results = [game for batch in pool.map(simulate_batch, chunks, [max_ticks] * len(chunks)) for game in batch]
+    elapsed = time.perf_counter() - start_time
+
+    if si is None:
+        # Aggregeringen trenger nivåkonfigurasjonene og TICK_RATE, som finnes rett etter import
+        import_game()
+    ticks = sum(game["ticks"] for game in results)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "games": games,
+            "workers": workers,
+            "seed": seed,
+            "max_ticks": max_ticks,
+            "seconds": elapsed,
+            "ticks": ticks,
+            "ticks_per_second": ticks / elapsed if elapsed > 0 else float('inf'),
+            "time": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        **aggregate(results),
+    }
+    report["game_results"] = [{key: game[key] for key in ("seed", "score", "ticks", "level", "wave")}
+                              for game in results]
+    return report
+
+
+def print_report(report):
+    meta, games = report["meta"], report["games"]
+    print(f"{meta['games']} spill på {meta['workers']} prosesser: {meta['seconds']:.1f} s, "
+          f"{meta['ticks_per_second']:.0f} ticks/s")
+    if not games["count"]:
+        print("Ingen spill ga resultater")
+        return
+    score = games["score"]
+    print(f"score: snitt {score['mean']:.0f}, p50 {score['p50']:.0f}, p90 {score['p90']:.0f}, "
+          f"maks {score['max']}; {games['timeouts']} spill nådde --max-ticks")
+    print(f"{'nivå':>4} {'mønster':<8} {'forsøk':>6} {'ryddet':>7} {'døde':>5} "
+          f"{'tid p50':>8} {'tid p90':>8} {'drap':>6} {'score':>7}")
+    for level in report["levels"]:
+        survival = level["survival_seconds"]
+        print(f"{level['level']:>4} {level['pattern']:<8} {level['attempts']:>6} {level['clear_rate']:>7.0%} "
+              f"{level['deaths']:>5} {survival['p50']:>7.1f}s {survival['p90']:>7.1f}s "
+              f"{level['kills_per_wave']['mean']:>6.1f} {level['score']['mean']:>7.0f}")
+
+
+def positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"må være minst 1, fikk {value}")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallell simulering av mange Space Invaders-spill')
+    parser.add_argument('--games', type=positive_int, default=100, help='antall spill som simuleres')
+    parser.add_argument('--workers', type=positive_int, default=os.cpu_count(), help='antall prosesser')
+    parser.add_argument('--seed', type=int, default=1, help='seed for det første spillet')
+    parser.add_argument('--max-ticks', type=positive_int, default=60 * 60 * 10,
+                        help='avbryt et spill etter dette antallet ticks (standard 10 minutter)')
+    parser.add_argument('--chunk-size', type=positive_int, default=4, help='antall spill per oppgave til en prosess')
+    parser.add_argument('--json', metavar='FILE', default='batch_report.json', help='hvor rapporten skrives')
+    args = parser.parse_args()
+
+    report = run_batch(args.games, args.workers, args.seed, args.max_ticks, args.chunk_size)
+    print_report(report)
+    with open(args.json, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Rapport skrevet til {args.json}")
+
+
+if __name__ == '__main__':
+    main()
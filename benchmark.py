@@ -0,0 +1,282 @@
+"""Ytelsesmålinger for Space Invaders.
+
+Oppstart (importtid og tid til første bilde) måles i egne prosesser, slik at
+hver måling starter kaldt:
+
+    python benchmark.py startup --runs 10 --json startup.json
+
+Nivåsuiten spiller hvert nivå med autopiloten i et fast antall ticks, for alle
+formasjoner og runder, og måler tiden per tick for hver fase spillets PhaseTimers
+følger (oppdatering, fiender, kollisjoner, partikler og tegning):
+
+    python benchmark.py levels --cycles 3 --ticks 600 --json levels.json
+    python benchmark.py levels --baseline levels.json
+
+Sprite-målingen blitter fiendene med og uten konvertering til skjermformatet
+og viser hvor mye minne spritene bruker:
+
+    python benchmark.py sprites --frames 300 --count 200
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Måler importtiden for avhengighetene og for selve spillmodulen hver for seg
+IMPORT_SNIPPET = """
+import json, time
+t0 = time.perf_counter()
+import pygame, numpy
+t1 = time.perf_counter()
+import space_invaders
+t2 = time.perf_counter()
+print(json.dumps({"dependencies_ms": (t1 - t0) * 1000, "module_ms": (t2 - t1) * 1000}))
+"""
+
+# Måler tiden fra import til det første bildet er tegnet (uten vindu)
+FIRST_FRAME_SNIPPET = """
+import json, time
+t0 = time.perf_counter()
+import space_invaders as si
+t1 = time.perf_counter()
+si.init_game(headless=True)
+t2 = time.perf_counter()
+si.reset_game()
+si.screen.fill(si.BLACK)
+si.draw_game_elements()
+si.pygame.display.flip()
+t3 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "init_ms": (t2 - t1) * 1000,
+                  "first_frame_ms": (t3 - t0) * 1000}))
+"""
+
+
+def run_snippet(snippet):
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy', PYGAME_HIDE_SUPPORT_PROMPT='1')
+    result = subprocess.run([sys.executable, '-c', snippet], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    """Slår sammen målinger fra flere kjøringer til median og minimum per felt"""
+    return {
+        key: {"median": statistics.median(s[key] for s in samples), "min": min(s[key] for s in samples)}
+        for key in samples[0]
+    }
+
+
+def bench_startup(runs):
+    # Første kjøring varmer opp sprite-cachen og .pyc-filene, så den telles ikke
+    run_snippet(FIRST_FRAME_SNIPPET)
+    return {
+        "import": summarize([run_snippet(IMPORT_SNIPPET) for _ in range(runs)]),
+        "first_frame": summarize([run_snippet(FIRST_FRAME_SNIPPET) for _ in range(runs)]),
+    }
+
+
+def percentiles(samples_ms):
+    """p50/p95/p99 og snitt for en liste med tider i millisekunder"""
+    cuts = statistics.quantiles(samples_ms, n=100, method='inclusive')
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98], "mean": statistics.fmean(samples_ms)}
+
+
+def bench_level(si, level, ticks, seed):
+    """Spiller ett nivå med autopiloten og måler hver tick.
+
+    Blir nivået ryddet eller spillet tapt, startes samme nivå på nytt med samme
+    seed, så hele målingen foregår på nivået som måles.
+    """
+    def start_level():
+        si.reset_game(seed)
+        si.current_level = level
+        si.create_aliens()
+
+    # Egne fasetidtakere for nivået: update_game() måler delfasene selv, vi måler
+    # 'update' og 'draw' rundt den, og hver tick blir én rad i historikken
+    timers = si.phase_timers = si.PhaseTimers(history=ticks)
+    timers.enabled = True
+    restarts = 0
+    start_level()
+    for tick in range(ticks):
+        move_left, move_right, fire = si.autopilot_input(tick)
+        if fire:
+            si.fire_player_bullet()
+        si.capture_previous_positions()
+
+        phase_start = timers.now()
+        game_over = si.update_game(move_left, move_right)
+        timers.add('update', phase_start)
+        phase_start = timers.now()
+        si.screen.fill(si.BLACK)
+        si.draw_game_elements()
+        si.bonus_text.draw(si.screen)
+        timers.add('draw', phase_start)
+        timers.end_frame()
+
+        if game_over or si.current_level != level:
+            start_level()
+            restarts += 1
+
+    # Faser benchmarken ikke kjører (hendelser, flip) har bare nuller og tas ikke med
+    frames = timers.recorded()
+    phases_ms = {phase: percentiles(frames[:, i].tolist())
+                 for phase, i in timers.index.items() if frames[:, i].any()}
+    config = si.level_configs.get_level(level)
+    return {
+        "level": level,
+        "cycle": (level - 1) // si.level_configs.max_level + 1,
+        "name": config.name,
+        "pattern": config.pattern,
+        "restarts": restarts,
+        "phases_ms": phases_ms,
+        "ticks_per_second": 1000 / phases_ms["update"]["mean"],
+    }
+
+
+def bench_levels(cycles, ticks, seed):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    sys.path.insert(0, ROOT)
+    import numpy
+    import pygame
+    import space_invaders as si
+
+    # Vanlig (ikke headless) init, så partikler og stjerner også måles
+    si.init_game(headless=False)
+    levels = range(1, cycles * si.level_configs.max_level + 1)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": numpy.__version__,
+            "ticks": ticks,
+            "seed": seed,
+            "time": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        "levels": [bench_level(si, level, ticks, seed) for level in levels],
+    }
+
+
+def bench_blits(si, surfaces, frames, count):
+    """Tegner `count` sprites per bilde i `frames` bilder og måler tiden per bilde"""
+    columns = 20
+    positions = [(40 + (i % columns) * 36, 40 + (i // columns) * 36 % 480) for i in range(count)]
+    frame_times = []
+    for frame in range(frames):
+        batch = [(surfaces[(i + frame // 30) % len(surfaces)], pos) for i, pos in enumerate(positions)]
+        t0 = time.perf_counter()
+        si.screen.fill(si.BLACK)
+        si.screen.blits(batch, doreturn=False)
+        frame_times.append((time.perf_counter() - t0) * 1000)
+    return {"frame_ms": percentiles(frame_times), "blits_per_second": count * frames / (sum(frame_times) / 1000)}
+
+
+def bench_sprites(frames, count):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    sys.path.insert(0, ROOT)
+    import space_invaders as si
+
+    si.init_game(headless=False)
+    # Samme sprites som spillet bruker, men rett fra create_*_sprite() uten konvertering
+    raw = [frame for frames in si.create_alien_sprites(si.USE_HD_GRAPHICS) for frame in frames]
+    converted = [si.sprites.get(sprite_id, frame) for sprite_id in si.ALIEN_SPRITE_IDS for frame in (0, 1)]
+    return {
+        "meta": {"frames": frames, "count": count, "display_bits": si.screen.get_bitsize()},
+        "raw": bench_blits(si, raw, frames, count),
+        "converted": bench_blits(si, converted, frames, count),
+        "memory_bytes": si.sprites.memory_report(),
+    }
+
+
+def print_sprite_results(results):
+    for name in ("raw", "converted"):
+        frame_ms = results[name]["frame_ms"]
+        print(f"{name:<10} p50 {frame_ms['p50']:7.3f} ms   p95 {frame_ms['p95']:7.3f} ms   "
+              f"{results[name]['blits_per_second']:10.0f} blits/s")
+    speedup = results["converted"]["blits_per_second"] / results["raw"]["blits_per_second"]
+    print(f"konvertert er {speedup:.2f}x raskere")
+    memory = results["memory_bytes"]
+    print(f"sprite-minne: {sum(memory.values()) / 1024:.1f} KiB")
+    for sprite_id, size in memory.items():
+        print(f"  {sprite_id:<24} {size / 1024:8.1f} KiB")
+
+
+def print_level_results(results, baseline=None):
+    previous = {entry["level"]: entry for entry in baseline["levels"]} if baseline else {}
+    phases = list(results["levels"][0]["phases_ms"]) if results["levels"] else []
+    print(f"{'':>4} {'':<8}" + "".join(f" {phase:>15}" for phase in phases))
+    print(f"{'nivå':>4} {'mønster':<8}" + f" {'p50':>7} {'p95':>7}" * len(phases) + f" {'ticks/s':>9}")
+    for entry in results["levels"]:
+        line = f"{entry['level']:>4} {entry['pattern']:<8}"
+        for phase in phases:
+            times = entry["phases_ms"][phase]
+            line += f" {times['p50']:7.3f} {times['p95']:7.3f}"
+        line += f" {entry['ticks_per_second']:9.0f}"
+        old = previous.get(entry["level"])
+        if old:
+            # Endring i ticks/s mot baseline, positivt er raskere
+            change = entry["ticks_per_second"] / old["ticks_per_second"] - 1
+            line += f" {change:+7.1%}"
+        print(line)
+
+
+def print_results(results):
+    for section, fields in results.items():
+        print(section)
+        for key, values in fields.items():
+            print(f"  {key:<18} median {values['median']:8.2f}   min {values['min']:8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ytelsesmålinger for Space Invaders')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    startup = subparsers.add_parser('startup', help='importtid og tid til første bilde')
+    startup.add_argument('--runs', type=int, default=10, help='antall kjøringer per måling')
+    startup.add_argument('--json', metavar='FILE', help='lagre resultatene som JSON')
+
+    levels = subparsers.add_parser('levels', help='oppdatering og tegning per nivå og runde')
+    levels.add_argument('--cycles', type=int, default=3, help='antall runder gjennom alle nivåene')
+    levels.add_argument('--ticks', type=int, default=600, help='antall ticks per nivå')
+    levels.add_argument('--seed', type=int, default=1, help='seed for spillogikken')
+    levels.add_argument('--baseline', metavar='FILE', help='sammenlign med en tidligere JSON-fil')
+    levels.add_argument('--json', metavar='FILE', help='lagre resultatene som JSON')
+
+    sprites = subparsers.add_parser('sprites', help='blit-hastighet med og uten konverterte sprites')
+    sprites.add_argument('--frames', type=int, default=300, help='antall bilder per måling')
+    sprites.add_argument('--count', type=int, default=200, help='antall sprites per bilde')
+    sprites.add_argument('--json', metavar='FILE', help='lagre resultatene som JSON')
+
+    args = parser.parse_args()
+
+    if args.command == 'startup':
+        results = bench_startup(args.runs)
+        print_results(results)
+    elif args.command == 'levels':
+        results = bench_levels(args.cycles, args.ticks, args.seed)
+        baseline = None
+        if args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        print_level_results(results, baseline)
+    elif args.command == 'sprites':
+        results = bench_sprites(args.frames, args.count)
+        print_sprite_results(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""Felles leaderboard-tjeneste for flere spillmaskiner.
+
+En liten HTTP/1.1-server (med keep-alive) som holder alle spilleres beste score
+i en Leaderboard fra spillet og eventuelt lagrer den til fil:
+
+    python leaderboard_server.py --port 8765 --file leaderboard.json
+    python space_invaders.py --leaderboard-url http://127.0.0.1:8765
+
+Endepunkter:
+    POST /scores   {"scores": [{"initials": "ABC", "score": 123}, ...]}
+    GET  /top?n=10
+    GET  /rank?initials=ABC
+"""
+import argparse
+import json
+import os
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+from space_invaders import (INITIALS_LENGTH, HighscoreWriter, Leaderboard, decode_highscores,
+                            encode_highscores, snapshot_entries)
+
+MAX_TOP = 1000  # Største topplisten en klient kan be om
+MAX_BODY = 1 << 20  # Største forespørsel som godtas (1 MB)
+
+
+class LeaderboardState:
+    """Leaderboard delt mellom forespørselstrådene, med valgfri lagring til fil"""
+
+    def __init__(self, filename=None):
+        self.lock = threading.Lock()
+        self.leaderboard = Leaderboard()
+        self.writer = None
+        if filename:
+            if os.path.exists(filename):
+                with open(filename) as f:
+                    self.leaderboard = Leaderboard(decode_highscores(json.load(f)))
+            self.writer = HighscoreWriter(filename, lambda snapshot: encode_highscores(snapshot_entries(snapshot)))
+
+    def submit(self, scores):
+        with self.lock:
+            improved = sum(self.leaderboard.submit(initials, score) for initials, score in scores)
+            ranks = {initials: self.leaderboard.rank(initials) for initials, _ in scores}
+            if improved and self.writer is not None:
+                self.writer.save(self.leaderboard.snapshot())
+        return {"accepted": len(scores), "improved": improved, "ranks": ranks}
+
+    def top(self, count):
+        with self.lock:
+            entries = self.leaderboard.top(count)
+            total = len(self.leaderboard)
+        return {"top": [{"initials": initials, "score": score} for initials, score in entries], "count": total}
+
+    def rank(self, initials):
+        with self.lock:
+            return {"initials": initials, "rank": self.leaderboard.rank(initials),
+                    "score": self.leaderboard.score(initials)}
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def parse_scores(data):
+    """Sjekker innsendte scorer og returnerer dem som (initialer, score)"""
+    scores = []
+    for entry in data["scores"]:
+        initials, score = entry["initials"], entry["score"]
+        if not isinstance(initials, str) or len(initials) != INITIALS_LENGTH:
+            raise ValueError(f"ugyldige initialer: {initials!r}")
+        if not isinstance(score, int) or isinstance(score, bool) or score < 0:
+            raise ValueError(f"ugyldig score: {score!r}")
+        scores.append((initials, score))
+    return scores
+
+
+class LeaderboardHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, så klientene kan gjenbruke forbindelser
+    server_version = 'SpaceInvadersLeaderboard/1.0'
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        try:
+            if url.path == '/top':
+                count = int(query.get('n', ['10'])[0])
+                if count < 0:
+                    raise ValueError(f"ugyldig antall: {count}")
+                count = min(count, MAX_TOP)
+                self.send_json(200, self.server.state.top(count))
+            elif url.path == '/rank':
+                self.send_json(200, self.server.state.rank(query['initials'][0]))
+            else:
+                self.send_json(404, {"error": "ukjent adresse"})
+        except (KeyError, ValueError) as e:
+            self.send_json(400, {"error": str(e)})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            if length < 0:
+                raise ValueError(f"ugyldig Content-Length: {length}")
+        except ValueError as e:
+            # Uten gyldig lengde vet vi ikke hvor forespørselen slutter, så forbindelsen lukkes
+            self.send_json(400, {"error": str(e)})
+            self.close_connection = True
+            return
+        if length > MAX_BODY:
+            self.send_json(413, {"error": "forespørselen er for stor"})
+            self.close_connection = True
+            return
+        body = self.rfile.read(length)
+        if urllib.parse.urlsplit(self.path).path != '/scores':
+            self.send_json(404, {"error": "ukjent adresse"})
+            return
+        try:
+            scores = parse_scores(json.loads(body))
+        except (KeyError, TypeError, ValueError) as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        self.send_json(200, self.server.state.submit(scores))
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def create_server(host='127.0.0.1', port=8765, filename=None, verbose=False):
+    """Lager serveren uten å starte den; port 0 gir en ledig port (nyttig i tester)"""
+    server = ThreadingHTTPServer((host, port), LeaderboardHandler)
+    server.daemon_threads = True
+    server.state = LeaderboardState(filename)
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Felles leaderboard for Space Invaders')
+    parser.add_argument('--host', default='127.0.0.1', help='adressen serveren lytter på')
+    parser.add_argument('--port', type=int, default=8765, help='porten serveren lytter på')
+    parser.add_argument('--file', metavar='FIL', default=None, help='lagre leaderboardet i denne filen')
+    parser.add_argument('--verbose', action='store_true', help='logg hver forespørsel')
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.file, args.verbose)
+    host, port = server.server_address[:2]
+    print(f"Leaderboard-tjenesten lytter på http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.state.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+import numpy as np
+
+import space_invaders as si
+
+
+def make_store(count):
+    store = si.AlienStore()
+    store.extend(np.arange(count) * 40.0, np.zeros(count), 0, 1.0, True)
+    return store
+
+
+def test_fire_returns_each_shooter_at_most_once_per_tick():
+    si.seed_game(1)
+    scheduler = si.AlienFireScheduler(make_store(20))
+    shots = 0
+    for _ in range(200):
+        # Mange skudd per tick i snitt, så uten sperren ville samme skytter komme igjen
+        firing = scheduler.fire(3.0)
+        assert len(firing) == len(set(firing))
+        shots += len(firing)
+    assert shots > 0
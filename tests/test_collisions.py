@@ -0,0 +1,52 @@
+import numpy as np
+
+import space_invaders as si
+
+WIDTH, HEIGHT = si.AlienStore.WIDTH, si.AlienStore.HEIGHT
+
+
+def overlapping(ax, ay, bx, by):
+    return ((ax < bx + si.BULLET_WIDTH) & (ax + WIDTH > bx) &
+            (ay < by + si.BULLET_HEIGHT) & (ay + HEIGHT > by))
+
+
+def all_pairs(x, y, bullet_x, bullet_y):
+    bullets, aliens = np.divmod(np.arange(len(bullet_x) * len(x)), len(x))
+    touching = overlapping(x[aliens], y[aliens], bullet_x[bullets], bullet_y[bullets])
+    return set(zip(bullets[touching].tolist(), aliens[touching].tolist()))
+
+
+def grid_pairs(grid, x, y, bullet_x, bullet_y):
+    grid.rebuild(x, y, WIDTH, HEIGHT)
+    bullets, aliens = grid.query_pairs(bullet_x, bullet_y, si.BULLET_WIDTH, si.BULLET_HEIGHT)
+    touching = overlapping(x[aliens], y[aliens], bullet_x[bullets], bullet_y[bullets])
+    return set(zip(bullets[touching].tolist(), aliens[touching].tolist()))
+
+
+def test_grid_finds_the_same_pairs_as_all_pairs():
+    rng = np.random.default_rng(1)
+    grid = si.SpatialGrid()
+    found = 0
+    for _ in range(300):
+        n, bullets = rng.integers(1, 300), rng.integers(1, 40)
+        # Litt utenfor skjermen også, der objektene havner i kantcellene
+        x = rng.integers(-80, si.SCREEN_WIDTH + 80, n).astype(float)
+        y = rng.integers(-80, si.SCREEN_HEIGHT + 80, n).astype(float)
+        bullet_x = rng.integers(-80, si.SCREEN_WIDTH + 80, bullets).astype(float)
+        bullet_y = rng.integers(-80, si.SCREEN_HEIGHT + 80, bullets).astype(float)
+        expected = all_pairs(x, y, bullet_x, bullet_y)
+        assert grid_pairs(grid, x, y, bullet_x, bullet_y) == expected
+        found += len(expected)
+    assert found > 0
+
+
+def test_game_plays_the_same_with_the_grid(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    expected = si.run_headless(waves=10 ** 9, max_ticks=6000, seed=3)
+    final = (si.score, si.current_level, si.current_wave)
+    # Med grensen på 0 går hver kollisjonssjekk i spillet gjennom rutenettet
+    monkeypatch.setattr(si, 'BROADPHASE_MIN_PAIRS', 0)
+    actual = si.run_headless(waves=10 ** 9, max_ticks=6000, seed=3)
+    assert (actual["games"], actual["waves"], actual["high_score"]) == \
+        (expected["games"], expected["waves"], expected["high_score"])
+    assert (si.score, si.current_level, si.current_wave) == final
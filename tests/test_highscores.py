@@ -0,0 +1,30 @@
+import json
+
+from space_invaders import HighscoreWriter, Leaderboard, decode_highscores, encode_highscores, snapshot_entries
+
+
+def test_legacy_list_round_trips_through_compact_format():
+    legacy = [
+        {"initials": "ABC", "score": 300},
+        {"initials": "AB", "score": 200},
+        {"initials": "ABCD", "score": 100},
+    ]
+    entries = snapshot_entries(Leaderboard(decode_highscores(legacy)).snapshot())
+    saved = json.loads(json.dumps(encode_highscores(entries)))
+
+    assert decode_highscores(saved) == [("ABC", 300), ("AB ", 200)]
+
+
+def test_failed_save_leaves_no_temp_file(tmp_path):
+    path = tmp_path / "highscores.json"
+    path.write_text("[]")
+    writer = HighscoreWriter(str(path))
+    try:
+        # json.dump har skrevet en del av filen før den møter objektet den ikke kan kode
+        writer.save({"entries": [1, 2, object()]})
+        assert writer.flush()
+    finally:
+        writer.close()
+
+    assert [p.name for p in tmp_path.iterdir()] == ["highscores.json"]
+    assert path.read_text() == "[]"
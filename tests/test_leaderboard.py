@@ -0,0 +1,73 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+import leaderboard_server
+from space_invaders import Leaderboard, LeaderboardClient
+
+
+@pytest.fixture
+def server():
+    server = leaderboard_server.create_server(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_rejected_batch_does_not_block_later_scores(server):
+    host, port = server.server_address[:2]
+    client = LeaderboardClient(f"http://{host}:{port}", batch_interval=0.05)
+    try:
+        client.submit("AB", 100)  # Feil lengde på initialene, serveren svarer 400
+        assert client.flush(timeout=5.0)
+        client.submit("ABC", 200)
+        assert client.flush(timeout=5.0)
+    finally:
+        client.close()
+
+    assert server.state.rank("ABC") == {"initials": "ABC", "rank": 1, "score": 200}
+    assert server.state.rank("AB")["score"] is None
+
+
+def test_flush_without_pending_scores_keeps_batching(server):
+    host, port = server.server_address[:2]
+    client = LeaderboardClient(f"http://{host}:{port}", batch_interval=0.05)
+    try:
+        assert client.flush(timeout=5.0)
+        assert not client.flush_requested
+    finally:
+        client.close()
+
+
+def request(server, method, path, headers=None):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5.0)
+    try:
+        connection.request(method, path, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_top_rejects_negative_and_non_integer_count(server):
+    server.state.submit([("ABC", 300), ("DEF", 200)])
+    assert request(server, 'GET', '/top?n=-1')[0] == 400
+    assert request(server, 'GET', '/top?n=ti')[0] == 400
+    status, data = request(server, 'GET', '/top?n=0')
+    assert status == 200 and data["top"] == []
+
+
+def test_scores_rejects_invalid_content_length(server):
+    assert request(server, 'POST', '/scores', {'Content-Length': 'mye'})[0] == 400
+    assert request(server, 'POST', '/scores', {'Content-Length': '-1'})[0] == 400
+
+
+def test_leaderboard_top_with_non_positive_count_is_empty():
+    leaderboard = Leaderboard([("ABC", 300), ("DEF", 200)])
+    assert leaderboard.top(0) == []
+    assert leaderboard.top(-1) == []
+    assert leaderboard.top(1) == [("ABC", 300)]
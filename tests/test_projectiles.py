@@ -0,0 +1,49 @@
+import numpy as np
+
+import space_invaders as si
+
+P = si.ProjectileStore
+
+
+def make_store(small_count):
+    store = P()
+    store.SMALL_COUNT = small_count
+    return store
+
+
+def serials(store, indices):
+    return sorted(store.serial[indices].tolist())
+
+
+def test_lists_and_arrays_give_the_same_results():
+    rng = np.random.default_rng(2)
+    # Bare lister, bare arrays, og standardgrensen som bytter mellom dem underveis
+    stores = [make_store(10 ** 9), make_store(0), make_store(P.SMALL_COUNT)]
+    switched = set()
+    for tick in range(600):
+        # Bølger av skudd, så antallet går over og under grensen flere ganger
+        burst = 12 if (tick // 60) % 2 == 0 else 0
+        count = rng.integers(0, burst + 1)
+        if count:
+            x = rng.integers(0, si.SCREEN_WIDTH, count)
+            owner = int(rng.integers(0, 2))
+            y = np.full(count, si.SCREEN_HEIGHT - 20 if owner == P.PLAYER else 20)
+            speed = -si.BULLET_SPEED if owner == P.PLAYER else si.ALIEN_BULLET_SPEED
+            for store in stores:
+                store.add(x, y, 0, speed, owner)
+        for store in stores:
+            store.step()
+        rect = (int(rng.integers(0, si.SCREEN_WIDTH)), int(rng.integers(0, si.SCREEN_HEIGHT)), 60, 60)
+        for owner in (P.PLAYER, P.ALIEN):
+            expected = serials(stores[0], stores[0].hits(owner, *rect))
+            assert all(serials(store, store.hits(owner, *rect)) == expected for store in stores[1:])
+        player = [serials(store, store.indices(P.PLAYER)) for store in stores]
+        assert player[1] == player[0] and player[2] == player[0]
+        # Fjern det samme skuddet i alle lagrene, identifisert ved serienummeret
+        if player[0] and tick % 3 == 0:
+            target = player[0][0]
+            for store in stores:
+                store.remove(np.flatnonzero(store.serial[:store.count] == target))
+        assert len({len(store) for store in stores}) == 1
+        switched.add(stores[2].arrays is None)
+    assert switched == {True, False}
@@ -0,0 +1,36 @@
+import space_invaders as si
+
+
+def test_seeded_replay_round_trips(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # init_game() leser highscores fra arbeidsmappen
+    recorder = si.InputRecorder()
+    # Seeden nær grensen sjekker at seed + k for senere spill går rundt i stedet for å krasje
+    stats = si.run_headless(waves=10 ** 9, max_ticks=6000, seed=si.SEED_LIMIT - 2, recorder=recorder)
+    final = (si.score, si.current_level, si.current_wave)
+    path = tmp_path / "runde.rec"
+    recorder.save(path)
+
+    replay = si.run_replay(path)
+    games = replay["games"]
+    assert [game["seed"] for game in games] == [(si.SEED_LIMIT - 2 + k) % si.SEED_LIMIT for k in range(stats["games"])]
+    assert replay["ticks"] == stats["ticks"]
+    assert all(game["game_over"] for game in games[:-1])
+    last = games[-1]
+    assert (last["score"], last["level"], last["wave"]) == final
+
+
+def test_negative_seed_is_wrapped():
+    assert si.seed_game(-1) == si.SEED_LIMIT - 1
+
+
+def test_recording_with_more_than_65535_games_round_trips(tmp_path):
+    recorder = si.InputRecorder()
+    for seed in range(70000):
+        recorder.start_game(seed)
+        recorder.record_tick(True, False)
+    path = tmp_path / "lang.rec"
+    recorder.save(path)
+
+    games = si.load_replay(path)
+    assert len(games) == 70000
+    assert games[-1] == (69999, bytearray(b'\x01'))